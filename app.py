@@ -1,12 +1,20 @@
 import os
 os.environ["STREAMLIT_WATCHER_TYPE"] = "poll"  # Prevent inotify limit error
 
+import asyncio
+import functools
+import re
+import secrets
+from urllib.parse import quote_plus
+
 import streamlit as st
-import google.generativeai as genai
-import requests
-from fpdf import FPDF
-import matplotlib.pyplot as plt
-from deep_translator import GoogleTranslator
+import streamlit.components.v1 as components
+import httpx
+import orjson
+
+# fpdf and pandas are imported lazily at their call sites — they are only
+# needed after an itinerary exists, and keeping them off the module level
+# cuts cold-start time of the input form.
 
 # -------------------------------
 # Streamlit Page Setup
@@ -19,11 +27,266 @@ st.write("Plan your dream trip with Google Gemini 1.5 Pro ✈️")
 # -------------------------------
 # API Key Configuration
 # -------------------------------
-if "GOOGLE_API_KEY" not in st.secrets:
+@functools.cache
+def _env(name):
+    """Resolve a key once from the environment or Streamlit secrets."""
+    return os.getenv(name) or (st.secrets.get(name) if hasattr(st, "secrets") else None)
+
+
+if not _env("GOOGLE_API_KEY"):
     st.error("❌ Missing API key in Streamlit Secrets. Please add GOOGLE_API_KEY in your Streamlit Cloud settings.")
     st.stop()
 
-genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
+
+@functools.cache
+def _genai():
+    """Import and configure google.generativeai on first use.
+
+    The SDK pulls in grpc/protobuf and is only needed once the user clicks
+    Generate, so keeping it off the module level trims cold start of the form.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=_env("GOOGLE_API_KEY"))
+    return genai
+
+# -------------------------------
+# Gemini Model
+# -------------------------------
+# All static instruction lives here so every request shares the same prefix
+# and Gemini's implicit caching can match it; the per-request turn carries
+# only the variables.
+PLANNER_SYSTEM = (
+    "You are a budget travel planner. Produce a detailed day-wise itinerary in "
+    "markdown with 'Day N:' headings and short sections for accommodation, food, "
+    "transport and activities. Include specific places to visit and estimated "
+    "costs in the traveller's budget currency. Respond in the requested language, "
+    "but always keep the 'Day N:' day headings in English."
+)
+
+
+@st.cache_resource
+def _planner_model(name="gemini-1.5-pro"):
+    """Planner model, constructed once per process.
+
+    The stable system-instruction prefix gets Gemini's implicit caching
+    discount on repeat requests. Explicit CachedContent was tried and
+    dropped: this preamble sits far below the model's explicit-cache
+    minimum, so creation can never succeed and each attempt would cost a
+    synchronous API round trip per click.
+    """
+    return _genai().GenerativeModel(name, system_instruction=PLANNER_SYSTEM)
+
+
+# -------------------------------
+# Weather Helpers
+# -------------------------------
+FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+
+
+# Keyed by OpenWeather's 'main' condition enum — a single-token value like
+# "Rain" or "Clear", so no lowercasing or substring scans per entry.
+ICONS = {
+    "Rain": "🌧️",
+    "Drizzle": "🌧️",
+    "Thunderstorm": "⛈️",
+    "Clouds": "⛅",
+    "Clear": "☀️",
+    "Snow": "🌨️",
+}
+
+
+def _parse_forecast(data, days):
+    """Turn the raw OpenWeather forecast JSON into one line per day.
+
+    The 3-hourly entries are loaded into a DataFrame once and downsampled
+    with a vectorized groupby instead of stride indexing in a Python loop.
+    Keeps the line-list shape that merge_weather and the MCP tool expect.
+    """
+    import pandas as pd
+
+    df = pd.json_normalize(data["list"])
+    df["date"] = pd.to_datetime(df["dt_txt"]).dt.date
+    daily = df.groupby("date", sort=True).first().head(days).reset_index()
+    desc = daily["weather"].str[0].str["description"]
+    lines = (
+        daily["date"].astype(str)
+        + ": "
+        + daily["weather"].str[0].str["main"].map(ICONS).fillna("☀️")
+        + " "
+        + desc.str.title()
+        + ", "
+        + daily["main.temp"].astype(str)
+        + "°C"
+    )
+    return lines.tolist()
+
+
+def _forecast_url(destination, days):
+    # cnt caps the 3-hour slots server-side; no point downloading the full
+    # 5-day payload for a shorter trip.
+    api_key = _env("OPENWEATHER_API_KEY")
+    if not api_key:
+        return None
+    return f"{FORECAST_URL}?q={destination}&units=metric&cnt={min(days * 8, 40)}&appid={api_key}"
+
+
+async def get_weather_forecast_async(destination, days, client):
+    """Fetch the day-wise OpenWeather forecast for the Generate pipeline and
+    the MCP weather tool."""
+    url = _forecast_url(destination, days)
+    if not url:
+        return []
+    response = await client.get(url)
+    if response.status_code != 200:
+        return []
+    return _parse_forecast(orjson.loads(response.content), days)
+
+
+# -------------------------------
+# Translation
+# -------------------------------
+LANG_CODES = {"Telugu": "te", "Hindi": "hi", "French": "fr", "Spanish": "es"}
+
+
+def translate_text(text, language):
+    """Translate already-generated text via the free Google endpoint.
+
+    Milliseconds and zero tokens, versus seconds and double token spend for
+    re-invoking Gemini on text it just produced. The Streamlit app avoids
+    even this by asking Gemini for the target language in the first prompt;
+    this helper serves the MCP translate tool.
+    """
+    if language == "English":
+        return text
+    from concurrent.futures import ThreadPoolExecutor
+
+    from deep_translator import GoogleTranslator
+
+    target = LANG_CODES.get(language, language.lower())
+    # Split on day boundaries and translate the chunks concurrently — one
+    # multi-KB payload serializes on the endpoint and can hit its size cap.
+    chunks = re.split(r"(?=^\s*day\b)", text, flags=re.MULTILINE | re.IGNORECASE)
+    if len(chunks) <= 1:
+        return GoogleTranslator(source="auto", target=target).translate(text)
+
+    def _one(chunk):
+        if sum(ch.isalpha() for ch in chunk) < 3:
+            return chunk  # nothing translatable; skip the round trip
+        # translate() mutates instance state (the request payload dict), so
+        # each chunk needs its own translator — sharing one across the pool
+        # races and can return the same chunk's translation for all of them.
+        return GoogleTranslator(source="auto", target=target).translate(chunk)
+
+    with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as pool:
+        return "".join(pool.map(_one, chunks))
+
+
+# -------------------------------
+# PDF Export
+# -------------------------------
+FONT_PATH = os.path.join(os.path.dirname(__file__), "DejaVuSans.ttf")
+
+
+@st.cache_data(show_spinner=False)
+def export_pdf_bytes(text):
+    """Render the itinerary to PDF bytes in memory.
+
+    Each cache miss builds a fresh FPDF and re-parses the font: output()
+    subsets the registered TTFont in place, and fpdf2's deepcopy shares it,
+    so any reused template is corrupted by its first export. The memo on
+    the itinerary text bounds how often the font parse is actually paid.
+    """
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_font("DejaVu", "", FONT_PATH)
+    pdf.add_page()
+    pdf.set_font("DejaVu", size=12)
+    pdf.multi_cell(0, 10, str(text))
+    return bytes(pdf.output())
+
+
+def export_pdf(itinerary):
+    """Export itinerary to PDF on disk and return the filename (MCP tool API)."""
+    pdf_file = "itinerary.pdf"
+    with open(pdf_file, "wb") as f:
+        f.write(export_pdf_bytes(itinerary))
+    return pdf_file
+
+
+# -------------------------------
+# Budget Breakdown
+# -------------------------------
+_BUDGET_LABELS = ("Travel", "Stay", "Food", "Activities", "Misc")
+_BUDGET_SHARES = (0.30, 0.25, 0.20, 0.15, 0.10)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _budget_breakdown(amount):
+    """Budget split as a DataFrame for st.bar_chart, memoized per amount."""
+    import pandas as pd
+
+    return pd.DataFrame({"Amount": [amount * share for share in _BUDGET_SHARES]}, index=list(_BUDGET_LABELS))
+
+
+# -------------------------------
+# Destination Map
+# -------------------------------
+@st.cache_data(show_spinner=False)
+def _maps_html(destination):
+    """Embed markup memoized per destination so reruns emit identical bytes
+    and the browser keeps the already-loaded iframe instead of refetching
+    tiles; loading="lazy" defers the first fetch until it scrolls into view."""
+    maps_url = f"https://www.google.com/maps?q={quote_plus(destination)}&output=embed"
+    return (
+        f'<iframe loading="lazy" referrerpolicy="no-referrer-when-downgrade" '
+        f'sandbox="allow-scripts allow-same-origin" width="700" height="400" src="{maps_url}"></iframe>'
+    )
+
+
+# Matches 'Day 1', 'DAY  2:' etc. at line start, but not words like 'Daybreak'
+_DAY_RE = re.compile(r"^\s*day\s*\d+", re.IGNORECASE)
+
+
+def merge_weather(itinerary, forecast_lines):
+    """Insert the matching day's forecast under each 'Day N' heading."""
+    wx_lines = [f"   🌦️ Weather: {line}" for line in forecast_lines]
+    out = []
+    day_index = 0
+    for line in itinerary.splitlines():
+        out.append(line)
+        if day_index < len(wx_lines) and _DAY_RE.match(line):
+            out.append(wx_lines[day_index])
+            day_index += 1
+    return "\n".join(out)
+
+
+async def _generate_plan(destination, days, budget, language, preview):
+    """Stream the Gemini itinerary into `preview` while the weather fetch runs."""
+    model = _planner_model()
+    prompt = f"Destination={destination}; Days={days}; Budget={budget}; Language={language}"
+
+    async def _stream_itinerary():
+        stream = await model.generate_content_async(prompt, stream=True)
+        parts = []
+        async for chunk in stream:
+            if chunk.text:
+                parts.append(chunk.text)
+                # Keep the draft in session state as it grows, so a failure
+                # mid-stream still leaves the partial itinerary on screen.
+                st.session_state.itinerary = "".join(parts)
+                preview.markdown(st.session_state.itinerary)
+        return "".join(parts)
+
+    # One AsyncClient per pipeline run: httpx pools are bound to the event
+    # loop, and Streamlit starts a fresh loop per asyncio.run, so a
+    # module-scoped client would hand out dead connections on the next click.
+    async with httpx.AsyncClient(timeout=10) as client:
+        weather_task = asyncio.create_task(get_weather_forecast_async(destination, days, client))
+        itinerary, forecast_lines = await asyncio.gather(_stream_itinerary(), weather_task)
+    return itinerary, forecast_lines
+
 
 # -------------------------------
 # Input Fields
@@ -36,44 +299,77 @@ language = st.selectbox("Preferred Language", ["English", "Telugu", "Hindi", "Fr
 if st.button("✨ Generate Trip Plan"):
     with st.spinner("Planning your trip... 🌍"):
         try:
-            # Initialize Model (v1)
-            model = genai.GenerativeModel("gemini-1.5-pro")
+            cache_key = (destination, days, budget, language)
+            plans = st.session_state.setdefault("plan_cache", {})
+            if cache_key in plans:
+                itinerary, weather_info = plans[cache_key]
+            else:
+                # Itinerary (streamed, already in the chosen language) + Weather
+                preview = st.empty()
+                itinerary, forecast_lines = asyncio.run(_generate_plan(destination, days, budget, language, preview))
+                if forecast_lines:
+                    itinerary = merge_weather(itinerary, forecast_lines)
+                weather_info = "\n".join(forecast_lines) if forecast_lines else "Weather info not available"
 
-            # Step 1: Generate Itinerary
-            prompt = f"Plan a detailed {days}-day travel itinerary for {destination} within {budget}. Include places, food, activities, and estimated costs."
-            response = model.generate_content(prompt)
-            itinerary = response.text
+                preview.empty()  # final version renders in the results section below
+                plans[cache_key] = (itinerary, weather_info)
 
-            # Step 2: Weather Data (optional example using Open-Meteo)
-            weather_url = f"https://wttr.in/{destination}?format=3"
-            weather_response = requests.get(weather_url)
-            weather_info = weather_response.text if weather_response.status_code == 200 else "Weather info not available"
+            st.session_state.itinerary = itinerary
+            st.session_state.weather_info = weather_info
+            st.session_state.trip_destination = destination
 
-            # Step 3: Translation (if selected)
-            if language != "English":
-                itinerary = GoogleTranslator(source="auto", target=language.lower()).translate(itinerary)
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
 
-            # Display
-            st.subheader("🧭 Trip Itinerary")
-            st.write(itinerary)
+@st.fragment
+def booking_fragment():
+    """Demo booking UI, isolated so typing here reruns only this fragment.
 
-            st.subheader("🌦️ Weather Forecast")
-            st.write(weather_info)
+    Without the fragment every keystroke in the name field replayed the whole
+    script — itinerary, chart, map and PDF included.
+    """
+    st.subheader("🎫 Book This Trip (Demo)")
+    with st.form("booking_form"):
+        traveller = st.text_input("Traveller Name")
+        submitted = st.form_submit_button("Confirm Booking")
+    if submitted and traveller:
+        st.session_state.booking_name = traveller
+    if "booking_name" in st.session_state:
+        # One mock reference per session — setdefault keeps it stable across
+        # reruns (and costs zero CSPRNG draws after the first confirmation).
+        ref = st.session_state.setdefault("booking_ref", f"EMT-DEMO-{secrets.token_hex(3).upper()}")
+        st.success(f"✅ Booking confirmed for {st.session_state.booking_name}! Reference: {ref}")
 
-            # Step 4: PDF Download
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            pdf.multi_cell(0, 10, f"Trip to {destination}\n\n{itinerary}\n\nWeather: {weather_info}")
 
-            pdf_path = "/mount/src/ai-trip-planner/trip_plan.pdf"
-            pdf.output(pdf_path)
+# -------------------------------
+# Results (persist across reruns)
+# -------------------------------
+if "itinerary" in st.session_state:
+    itinerary = st.session_state.itinerary
+    weather_info = st.session_state.get("weather_info", "Weather info not available")
 
-            with open(pdf_path, "rb") as file:
-                st.download_button("📄 Download Trip Plan PDF", file, file_name="TripPlan.pdf")
+    st.subheader("🧭 Trip Itinerary")
+    st.write(itinerary)
 
-        except Exception as e:
-            st.error(f"❌ Error: {e}")
+    st.subheader("🌦️ Weather Forecast")
+    st.write(weather_info)
+
+    # Destination Map
+    st.subheader("🗺️ Destination Map")
+    trip_destination = st.session_state.get("trip_destination", destination)
+    components.html(_maps_html(trip_destination), height=420)
+
+    # Budget Breakdown (client-side Vega-Lite chart — no matplotlib needed)
+    budget_amount = "".join(filter(str.isdigit, budget))
+    if budget_amount:
+        st.subheader("💰 Budget Breakdown")
+        st.bar_chart(_budget_breakdown(int(budget_amount)))
+
+    # PDF Download (built in memory, only rebuilt when the itinerary changes)
+    pdf_text = f"Trip to {trip_destination}\n\n{itinerary}\n\nWeather: {weather_info}"
+    st.download_button("📄 Download Trip Plan PDF", export_pdf_bytes(pdf_text), file_name="TripPlan.pdf", mime="application/pdf")
+
+    booking_fragment()
 
 # -------------------------------
 # Footer
@@ -0,0 +1,24 @@
+"""Deterministic, exact-match cache for Gemini text generation.
+
+Repeating the same (model, prompt) pair replays the stored answer instead of
+re-billing the API; generation runs at temperature 0 so the cached text stays
+representative of what a fresh call would return.
+"""
+
+import functools
+
+import google.generativeai as genai
+import streamlit as st
+
+
+@functools.lru_cache(maxsize=4)
+def _model(name):
+    """Model handles are pure construction; build each one once per process."""
+    return genai.GenerativeModel(name)
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def cached_generate(model_name, prompt, temperature=0.0):
+    """Generate (or replay) the response for an exact (model, prompt) pair."""
+    response = _model(model_name).generate_content(prompt, generation_config={"temperature": temperature})
+    return response.text
@@ -1,8 +1,18 @@
 import os
 import asyncio
+import functools
 import mcp.server
 
-from app import get_weather_forecast, export_pdf  # reuse your existing functions
+try:
+    import uvloop  # POSIX only; 2-4x faster event loop for the I/O fan-out
+    uvloop.install()
+except ImportError:
+    pass
+
+import httpx
+
+from app import export_pdf, get_weather_forecast_async, merge_weather, translate_text  # reuse your existing functions
+from llm_cache import cached_generate
 import google.generativeai as genai
 
 # Configure Gemini
@@ -10,6 +20,22 @@ genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 server = mcp.server.Server("ai-trip-planner-mcp")
 
+_http = None
+
+
+def _http_client() -> httpx.AsyncClient:
+    """Shared AsyncClient — the MCP server runs one long-lived event loop."""
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(timeout=10)
+    return _http
+
+
+@functools.lru_cache(maxsize=4)
+def get_model(name: str = "gemini-1.5-flash"):
+    return genai.GenerativeModel(name)
+
+
 # ---------------------------
 # MCP Tools
 # ---------------------------
@@ -18,25 +44,34 @@ server = mcp.server.Server("ai-trip-planner-mcp")
 async def generate_itinerary(destination: str, days: int, budget: int) -> str:
     """Generate a day-wise trip itinerary using Gemini AI."""
     prompt = f"Plan a {days}-day trip to {destination} for {budget} INR. Give it in day-wise format."
-    response = genai.GenerativeModel("gemini-1.5-flash").generate_content(prompt)
-    return response.text
+    return await asyncio.to_thread(cached_generate, "gemini-1.5-flash", prompt)
 
 @server.tool()
 async def weather_forecast(destination: str, days: int) -> list[str]:
     """Fetch weather forecast for given days using OpenWeather API."""
-    return get_weather_forecast(destination, days)
+    return await get_weather_forecast_async(destination, days, _http_client())
+
+@server.tool()
+async def plan_trip(destination: str, days: int, budget: int, language: str = "English") -> str:
+    """Generate itinerary and weather concurrently and merge them."""
+    prompt = f"Plan a {days}-day trip to {destination} for {budget} INR. Give it in day-wise format."
+    if language != "English":
+        prompt += f" Respond ONLY in {language}, but keep the 'Day N:' day headings in English."
+    response, forecast = await asyncio.gather(
+        get_model().generate_content_async(prompt),
+        get_weather_forecast_async(destination, days, _http_client()),
+    )
+    return merge_weather(response.text, forecast) if forecast else response.text
 
 @server.tool()
 async def translate_itinerary(itinerary: str, language: str) -> str:
-    """Translate itinerary into the target language using Gemini."""
-    translate_prompt = f"Translate the following itinerary into {language}, keep format neat:\n\n{itinerary}"
-    response = genai.GenerativeModel("gemini-1.5-flash").generate_content(translate_prompt)
-    return response.text
+    """Translate itinerary into the target language."""
+    return await asyncio.to_thread(translate_text, itinerary, language)
 
 @server.tool()
 async def export_itinerary_pdf(itinerary: str) -> str:
     """Export itinerary to PDF and return the filename."""
-    return export_pdf(itinerary)
+    return await asyncio.to_thread(export_pdf, itinerary)
 
 # ---------------------------
 # Main